@@ -14,127 +14,247 @@ so they appear together in Docker Desktop.
 """
 
 import os
+import errno
 import subprocess
 import shutil
+import secrets
+import mmap
+import tempfile
 import time
 import argparse
 import platform
+import sys
+import re
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Matches the SearXNG cap_drop directive in either its active or temporarily commented-out form
+_CAP_DROP_RE = re.compile(r"(# )?cap_drop: - ALL(  # Temporarily commented out for first run)?")
+_CAP_DROP_ACTIVE = "cap_drop: - ALL"
+_CAP_DROP_COMMENTED = "# cap_drop: - ALL  # Temporarily commented out for first run"
+
+# Keep the docker CLI from printing "What's next" hints and Docker Scout notices
+# after each compose/ps/exec call. The user's own environment takes precedence.
+_DOCKER_ENV = {
+    "DOCKER_CLI_HINTS": "false",
+    "DOCKER_SCOUT_SUPPRESS_INFO": "1",
+    **os.environ,
+}
+
+# Basic services managed by this script; override with a comma-separated
+# LOCALAI_BASIC_SERVICES (e.g. to time a single service's startup). An empty
+# override falls back to the defaults, since `up` with no services would
+# start the whole main stack.
+_DEFAULT_BASIC_SERVICES = ["postgres", "n8n", "neo4j", "searxng"]
+BASIC_SERVICES = [
+    service.strip()
+    for service in os.environ.get("LOCALAI_BASIC_SERVICES", "").split(",")
+    if service.strip()
+] or _DEFAULT_BASIC_SERVICES
+
+@functools.lru_cache(maxsize=None)
+def _compose_args(environment=None):
+    """Return the docker compose base arguments for the main stack in the given environment."""
+    args = ["docker", "compose", "-p", "localai", "-f", "docker-compose.yml"]
+    if environment == "private":
+        args.extend(["-f", "docker-compose.override.private.yml"])
+    elif environment == "public":
+        args.extend(["-f", "docker-compose.override.public.yml"])
+    return tuple(args)
+
+@functools.lru_cache(maxsize=None)
+def _supabase_compose_args(environment=None):
+    """Return the docker compose base arguments for the Supabase stack in the given environment."""
+    args = ["docker", "compose", "-p", "localai", "-f", "supabase/docker/docker-compose.yml"]
+    if environment == "public":
+        args.extend(["-f", "docker-compose.override.public.supabase.yml"])
+    return tuple(args)
+
+def scan_dir(path):
+    """Return a name -> DirEntry mapping for path, or an empty dict if it doesn't exist."""
+    try:
+        with os.scandir(path) as entries:
+            return {entry.name: entry for entry in entries}
+    except FileNotFoundError:
+        return {}
 
-def run_command(cmd, cwd=None):
+def run_command(cmd, cwd=None, env=_DOCKER_ENV):
     """Run a shell command and print it."""
     print("Running:", " ".join(cmd))
-    subprocess.run(cmd, cwd=cwd, check=True)
+    subprocess.run(cmd, cwd=cwd, env=env, check=True)
 
-def clone_supabase_repo():
+def clone_supabase_repo(root_entries=None):
     """Clone the Supabase repository using sparse checkout if not already present."""
-    if not os.path.exists("supabase"):
+    if root_entries is None:
+        root_entries = scan_dir(".")
+    if "supabase" not in root_entries:
         print("Cloning the Supabase repository...")
+        # Shallow, treeless clone: only the objects needed for docker/ are fetched
         run_command([
-            "git", "clone", "--filter=blob:none", "--no-checkout",
+            "git", "clone", "--filter=tree:0", "--depth=1", "--sparse", "--no-checkout",
             "https://github.com/supabase/supabase.git"
         ])
-        os.chdir("supabase")
-        run_command(["git", "sparse-checkout", "init", "--cone"])
-        run_command(["git", "sparse-checkout", "set", "docker"])
-        run_command(["git", "checkout", "master"])
-        os.chdir("..")
+        run_command(["git", "sparse-checkout", "set", "--cone", "docker"], cwd="supabase")
+        run_command(["git", "checkout", "master"], cwd="supabase")
     else:
         print("Supabase repository already exists, updating...")
-        os.chdir("supabase")
-        # Check if there are local changes
+        # Check if there are local changes to tracked files (skipping the
+        # untracked-file walk, which is the expensive part of git status)
         status_result = subprocess.run(
-            ["git", "status", "--porcelain"],
-            capture_output=True, text=True, check=True
+            ["git", "--no-optional-locks", "status", "--porcelain=v2",
+             "--untracked-files=no", "--no-ahead-behind"],
+            cwd="supabase", capture_output=True, text=True, encoding='utf-8', errors='replace', check=True
         )
         if status_result.stdout.strip():
             print("Local changes detected, stashing them...")
-            run_command(["git", "stash"])
-            run_command(["git", "pull", "--rebase=false"])
+            run_command(["git", "stash"], cwd="supabase")
+            run_command(["git", "pull", "--rebase=false"], cwd="supabase")
             print("Attempting to reapply stashed changes...")
             try:
-                run_command(["git", "stash", "pop"])
+                run_command(["git", "stash", "pop"], cwd="supabase")
             except subprocess.CalledProcessError:
                 print("Warning: Could not automatically reapply stashed changes.")
                 print("Your changes are saved in the stash. Use 'git stash list' to view them.")
         else:
-            run_command(["git", "pull", "--rebase=false"])
-        os.chdir("..")
+            run_command(["git", "pull", "--rebase=false"], cwd="supabase")
+
+# errno values meaning copy_file_range is not supported for these files
+_COPY_FALLBACK_ERRNOS = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP,
+                         errno.EOPNOTSUPP, errno.EBADF}
+
+def fast_copy(src, dst):
+    """Copy src to dst with copy_file_range (reflinks on CoW filesystems).
+
+    Without copy_file_range this is shutil.copyfile, which already uses sendfile on Linux.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src, dst)
+        return
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        # Copy until EOF rather than trusting st_size, which can be 0 or stale
+        blocksize = max(os.fstat(fsrc.fileno()).st_size, 8 * 1024 * 1024)
+        copied = 0
+        try:
+            while True:
+                sent = os.copy_file_range(fsrc.fileno(), fdst.fileno(), blocksize)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError as e:
+            if copied or e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+
+        # Nothing copied: unsupported here, or a file (e.g. procfs) the kernel
+        # reports as empty. Copy through user space like shutil does.
+        if copied == 0:
+            fsrc.seek(0)
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
 
 def prepare_supabase_env():
     """Copy .env to .env in supabase/docker."""
     env_path = os.path.join("supabase", "docker", ".env")
     env_example_path = os.path.join(".env")
     print("Copying .env in root to .env in supabase/docker...")
-    shutil.copyfile(env_example_path, env_path)
+    fast_copy(env_example_path, env_path)
 
 def stop_existing_containers():
     """Stop and remove existing containers for the basic services."""
     print("Stopping existing basic service containers...")
 
+    # List the project's containers once so compose calls with nothing to do can be skipped
+    result = subprocess.run(
+        ["docker", "ps", "-a", "--filter", "label=com.docker.compose.project=localai",
+         "--format", "{{.Label \"com.docker.compose.service\"}}"],
+        env=_DOCKER_ENV, capture_output=True, text=True, encoding='utf-8', errors='replace', check=False
+    )
+    existing_services = set(result.stdout.split()) if result.returncode == 0 else None
+    if existing_services is not None and not existing_services:
+        print("Nothing to stop.")
+        return
+
     # Stop Supabase stack
     try:
-        run_command(["docker", "compose", "-p", "localai", "-f", "supabase/docker/docker-compose.yml", "down"])
+        run_command(list(_supabase_compose_args()) + ["down"])
     except subprocess.CalledProcessError:
         print("No Supabase containers to stop or error occurred.")
 
-    # Stop only the basic services from the main stack
-    basic_services = ["postgres", "n8n", "neo4j", "searxng"]
-    for service in basic_services:
-        try:
-            cmd = ["docker", "compose", "-p", "localai", "-f", "docker-compose.yml"]
-            cmd.extend(["-f", "docker-compose.override.private.yml"])
-            cmd.extend(["stop", service])
-            run_command(cmd)
-        except subprocess.CalledProcessError:
-            print(f"No {service} container to stop or error occurred.")
-
-def start_supabase(environment=None, retries=3):
-    """Start the Supabase services (using its compose file)."""
-    print("Starting Supabase services...")
-    cmd = ["docker", "compose", "-p", "localai", "-f", "supabase/docker/docker-compose.yml"]
-    if environment and environment == "public":
-        cmd.extend(["-f", "docker-compose.override.public.supabase.yml"])
-    cmd.extend(["up", "-d"])
+    # Stop only the basic services from the main stack that actually exist
+    # (a single invocation; compose stops the listed services in parallel)
+    services = [service for service in BASIC_SERVICES
+                if existing_services is None or service in existing_services]
+    if not services:
+        return
+    try:
+        run_command(list(_compose_args("private")) + ["stop"] + services)
+    except subprocess.CalledProcessError:
+        print("No basic service containers to stop or error occurred.")
 
-    # Retry logic for network issues
+def start_command(cmd, cwd=None, env=_DOCKER_ENV):
+    """Start a shell command in the background, print it, and return the process."""
+    print("Running:", " ".join(cmd))
+    return subprocess.Popen(cmd, cwd=cwd, env=env)
+
+def wait_with_retry(process, retries=3):
+    """Wait for a started command, re-running it on failure (e.g. network issues)."""
+    cmd = process.args
     for attempt in range(retries):
-        try:
-            run_command(cmd)
+        if process.wait() == 0:
             return  # Success, exit the function
-        except subprocess.CalledProcessError:
-            if attempt < retries - 1:
-                print(f"\nAttempt {attempt + 1} failed. Retrying in 5 seconds...")
-                time.sleep(5)
-            else:
-                print(f"\nFailed after {retries} attempts.")
-                raise
-
-def start_basic_services(environment=None, retries=3):
-    """Start only the basic services: postgres, n8n, neo4j, searxng."""
-    print("Starting basic services (postgres, n8n, neo4j, searxng)...")
+        if attempt < retries - 1:
+            print(f"\nAttempt {attempt + 1} failed. Retrying in 5 seconds...")
+            time.sleep(5)
+            process = start_command(cmd)
+        else:
+            print(f"\nFailed after {retries} attempts.")
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+def wait_healthy(container, timeout=60):
+    """Poll a container until its healthcheck reports healthy, or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = subprocess.run(
+            ["docker", "inspect", "--format", "{{.State.Health.Status}}", container],
+            env=_DOCKER_ENV, capture_output=True, text=True, encoding='utf-8', errors='replace', check=False
+        )
+        if result.returncode != 0:
+            # Container not found yet (compose may still be creating it)
+            time.sleep(3)
+        elif result.stdout.strip() == "healthy":
+            print(f"{container} is healthy.")
+            return True
+        else:
+            time.sleep(0.2)
+    print(f"Warning: {container} did not report healthy within {timeout} seconds.")
+    return False
+
+def wait_for_network(network, process, timeout=60):
+    """Wait until a docker network exists, or until the process expected to create it exits."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        result = subprocess.run(
+            ["docker", "network", "inspect", network],
+            env=_DOCKER_ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+        if result.returncode == 0:
+            return
+        time.sleep(0.2)
 
-    # List of services to start
-    basic_services = ["postgres", "n8n", "neo4j", "searxng"]
+def start_supabase(environment=None):
+    """Start the Supabase services (using its compose file) and return the process."""
+    print("Starting Supabase services...")
+    # Plain progress: this runs alongside the basic services' compose up, and
+    # two interactive progress displays would overwrite each other
+    cmd = list(_supabase_compose_args(environment)) + ["--progress", "plain", "up", "-d"]
+    return start_command(cmd)
 
-    cmd = ["docker", "compose", "-p", "localai", "-f", "docker-compose.yml"]
-    if environment and environment == "private":
-        cmd.extend(["-f", "docker-compose.override.private.yml"])
-    if environment and environment == "public":
-        cmd.extend(["-f", "docker-compose.override.public.yml"])
-    cmd.extend(["up", "-d"] + basic_services)
+def start_basic_services(environment=None):
+    """Start only the basic services (BASIC_SERVICES) and return the process."""
+    print(f"Starting basic services ({', '.join(BASIC_SERVICES)})...")
 
-    # Retry logic for network issues
-    for attempt in range(retries):
-        try:
-            run_command(cmd)
-            return  # Success, exit the function
-        except subprocess.CalledProcessError:
-            if attempt < retries - 1:
-                print(f"\nAttempt {attempt + 1} failed. Retrying in 5 seconds...")
-                time.sleep(5)
-            else:
-                print(f"\nFailed after {retries} attempts.")
-                raise
+    # Plain progress, as this runs alongside the Supabase compose up
+    cmd = list(_compose_args(environment)) + ["--progress", "plain", "up", "-d"] + BASIC_SERVICES
+    return start_command(cmd)
 
 def generate_searxng_secret_key():
     """Generate a secret key for SearXNG based on the current platform."""
@@ -144,16 +264,19 @@ def generate_searxng_secret_key():
     settings_path = os.path.join("searxng", "settings.yml")
     settings_base_path = os.path.join("searxng", "settings-base.yml")
 
+    # One directory scan covers both existence checks below
+    searxng_entries = scan_dir("searxng")
+
     # Check if settings-base.yml exists
-    if not os.path.exists(settings_base_path):
+    if "settings-base.yml" not in searxng_entries:
         print(f"Warning: SearXNG base settings file not found at {settings_base_path}")
         return
 
     # Check if settings.yml exists, if not create it from settings-base.yml
-    if not os.path.exists(settings_path):
+    if "settings.yml" not in searxng_entries:
         print(f"SearXNG settings.yml not found. Creating from {settings_base_path}...")
         try:
-            shutil.copyfile(settings_base_path, settings_path)
+            fast_copy(settings_base_path, settings_path)
             print(f"Created {settings_path} from {settings_base_path}")
         except Exception as e:
             print(f"Error creating settings.yml: {e}")
@@ -163,25 +286,44 @@ def generate_searxng_secret_key():
 
     # Check if secret key needs to be generated (if file contains 'ultrasecretkey')
     try:
-        with open(settings_path, 'r') as f:
-            content = f.read()
+        # Scan for the placeholder without reading the file into memory
+        # (mmap cannot map an empty file, which has no placeholder anyway)
+        with open(settings_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                found = False
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    found = mm.find(b'ultrasecretkey') != -1
 
-        if 'ultrasecretkey' not in content:
+        if not found:
             print("SearXNG secret key already configured.")
             return
 
         print("Generating SearXNG secret key...")
 
-        # Generate random key using openssl
-        openssl_cmd = ["openssl", "rand", "-hex", "32"]
-        random_key = subprocess.check_output(openssl_cmd).decode('utf-8').strip()
+        with open(settings_path, 'r') as f:
+            content = f.read()
+
+        # Generate random key from the OS CSPRNG (same output format as openssl rand -hex 32)
+        random_key = secrets.token_hex(32)
 
         # Replace the key in memory
         updated_content = content.replace('ultrasecretkey', random_key)
 
-        # Write back to file with proper permissions
-        with open(settings_path, 'w') as f:
-            f.write(updated_content)
+        # Write to a sibling temp file and atomically swap it into place, so an
+        # interrupted write never leaves a truncated settings.yml behind
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(settings_path),
+                                        prefix='.settings.', suffix='.yml.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(updated_content)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(settings_path, tmp_path)
+            os.replace(tmp_path, settings_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
         print(f"SearXNG secret key generated successfully: {random_key[:16]}...")
 
@@ -191,10 +333,12 @@ def generate_searxng_secret_key():
         print("  - Linux: sed -i \"s|ultrasecretkey|$(openssl rand -hex 32)|g\" searxng/settings.yml")
         print("  - macOS: sed -i '' \"s|ultrasecretkey|$(openssl rand -hex 32)|g\" searxng/settings.yml")
 
-def check_and_fix_docker_compose_for_searxng():
+def check_and_fix_docker_compose_for_searxng(root_entries=None):
     """Check and modify docker-compose.yml for SearXNG first run."""
     docker_compose_path = "docker-compose.yml"
-    if not os.path.exists(docker_compose_path):
+    if root_entries is None:
+        root_entries = scan_dir(".")
+    if docker_compose_path not in root_entries:
         print(f"Warning: Docker Compose file not found at {docker_compose_path}")
         return
 
@@ -210,8 +354,9 @@ def check_and_fix_docker_compose_for_searxng():
         try:
             # Check if the SearXNG container is running
             container_check = subprocess.run(
-                ["docker", "ps", "--filter", "name=searxng", "--format", "{{.Names}}"],
-                capture_output=True, text=True, check=True
+                ["docker", "ps", "--filter", "name=searxng", "--filter", "status=running",
+                 "--format", "{{.Names}}"],
+                env=_DOCKER_ENV, capture_output=True, text=True, encoding='utf-8', errors='replace', check=True
             )
             searxng_containers = container_check.stdout.strip().split('\n')
 
@@ -220,13 +365,13 @@ def check_and_fix_docker_compose_for_searxng():
                 container_name = next(container for container in searxng_containers if container)
                 print(f"Found running SearXNG container: {container_name}")
 
-                # Check if uwsgi.ini exists inside the container
+                # Check if uwsgi.ini exists inside the container (no shell needed)
                 container_check = subprocess.run(
-                    ["docker", "exec", container_name, "sh", "-c", "[ -f /etc/searxng/uwsgi.ini ] && echo 'found' || echo 'not_found'"],
-                    capture_output=True, text=True, check=False
+                    ["docker", "exec", container_name, "test", "-f", "/etc/searxng/uwsgi.ini"],
+                    env=_DOCKER_ENV, capture_output=True, text=True, encoding='utf-8', errors='replace', check=False
                 )
 
-                if "found" in container_check.stdout:
+                if container_check.returncode == 0:
                     print("Found uwsgi.ini inside the SearXNG container - not first run")
                     is_first_run = False
                 else:
@@ -237,24 +382,30 @@ def check_and_fix_docker_compose_for_searxng():
         except Exception as e:
             print(f"Error checking Docker container: {e} - assuming first run")
 
-        if is_first_run and "cap_drop: - ALL" in content:
-            print("First run detected for SearXNG. Temporarily removing 'cap_drop: - ALL' directive...")
-            # Temporarily comment out the cap_drop line
-            modified_content = content.replace("cap_drop: - ALL", "# cap_drop: - ALL  # Temporarily commented out for first run")
+        def toggle_cap_drop(match):
+            if is_first_run and not match.group(1):
+                # Temporarily comment out the cap_drop line
+                return _CAP_DROP_COMMENTED
+            if not is_first_run and match.group(1) and match.group(2):
+                # Uncomment the cap_drop line
+                return _CAP_DROP_ACTIVE
+            return match.group(0)
+
+        # Rewrite every cap_drop directive in a single pass
+        modified_content = _CAP_DROP_RE.sub(toggle_cap_drop, content)
+
+        if modified_content != content:
+            if is_first_run:
+                print("First run detected for SearXNG. Temporarily removing 'cap_drop: - ALL' directive...")
+            else:
+                print("SearXNG has been initialized. Re-enabling 'cap_drop: - ALL' directive for security...")
 
             # Write the modified content back
             with open(docker_compose_path, 'w') as file:
                 file.write(modified_content)
 
-            print("Note: After the first run completes successfully, you should re-add 'cap_drop: - ALL' to docker-compose.yml for security reasons.")
-        elif not is_first_run and "# cap_drop: - ALL  # Temporarily commented out for first run" in content:
-            print("SearXNG has been initialized. Re-enabling 'cap_drop: - ALL' directive for security...")
-            # Uncomment the cap_drop line
-            modified_content = content.replace("# cap_drop: - ALL  # Temporarily commented out for first run", "cap_drop: - ALL")
-
-            # Write the modified content back
-            with open(docker_compose_path, 'w') as file:
-                file.write(modified_content)
+            if is_first_run:
+                print("Note: After the first run completes successfully, you should re-add 'cap_drop: - ALL' to docker-compose.yml for security reasons.")
 
     except Exception as e:
         print(f"Error checking/modifying docker-compose.yml for SearXNG: {e}")
@@ -265,25 +416,56 @@ def main():
                       help='Environment to use for Docker Compose (default: private)')
     args = parser.parse_args()
 
-    clone_supabase_repo()
+    # Scan the repository root once for the existence checks in the helpers below
+    root_entries = scan_dir(".")
+
+    clone_supabase_repo(root_entries)
     prepare_supabase_env()
 
     # Generate SearXNG secret key and check docker-compose.yml
     generate_searxng_secret_key()
-    check_and_fix_docker_compose_for_searxng()
+    check_and_fix_docker_compose_for_searxng(root_entries)
 
     # Stop existing containers (only the ones we're managing)
     stop_existing_containers()
 
-    # Start Supabase first
-    start_supabase(args.environment)
-
-    # Give Supabase some time to initialize
+    # Start Supabase and the basic services concurrently; the basic services
+    # do not depend on the Supabase stack at runtime. Both calls use project
+    # "localai" and docker-compose.yml includes the Supabase file, so they share
+    # the localai_default network: let the Supabase call create it first so the
+    # two don't race to create it.
+    supabase_start = time.perf_counter()
+    supabase_process = start_supabase(args.environment)
+    wait_for_network("localai_default", supabase_process)
+    basic_start = time.perf_counter()
+    basic_process = start_basic_services(args.environment)
+    processes = [
+        (["supabase"], supabase_start, supabase_process),
+        (BASIC_SERVICES, basic_start, basic_process),
+    ]
+
+    def wait_and_time(services, start_time, process):
+        wait_with_retry(process)
+        # A single write, so the line isn't split by the other compose process's output
+        sys.stdout.write(f"[timing] up took {time.perf_counter() - start_time:.1f}s for services={services}\n")
+        sys.stdout.flush()
+
+    # Wait for each process in its own thread so each timing reflects when that
+    # process finished. Leaving the with-block waits for both, so a failure in
+    # one never leaves the other's compose up running in the background.
+    with ThreadPoolExecutor(max_workers=len(processes)) as executor:
+        futures = [executor.submit(wait_and_time, services, start_time, process)
+                   for services, start_time, process in processes]
+    for future in futures:
+        future.result()
+
+    # Confirm the Supabase database is healthy instead of sleeping a fixed amount.
+    # This runs after `up -d` has returned; Supabase's own depends_on
+    # service_healthy conditions usually mean the DB is already healthy by now.
     print("Waiting for Supabase to initialize...")
-    time.sleep(10)
-
-    # Then start the basic services
-    start_basic_services(args.environment)
+    if not wait_healthy("supabase-db"):
+        print("\nError: Supabase database is not healthy. Check 'docker logs supabase-db'.")
+        sys.exit(1)
 
     print("\n" + "="*60)
     print("Basic services started successfully!")
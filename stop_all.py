@@ -11,11 +11,22 @@ import subprocess
 import argparse
 import sys
 
+# Silence docker CLI hints and Scout notices on the stop/ps calls below
+# (user-exported values win).
+_DOCKER_ENV = {
+    "DOCKER_CLI_HINTS": "false",
+    "DOCKER_SCOUT_SUPPRESS_INFO": "1",
+    **os.environ,
+}
 
-def run_command(cmd, cwd=None, check=False):
-    """Run a shell command and print it."""
+
+def run_command(cmd, cwd=None, check=False, env=_DOCKER_ENV, capture=True):
+    """Run a shell command and print it. With capture=False, output streams to the terminal."""
     print("Running:", " ".join(cmd))
-    result = subprocess.run(cmd, cwd=cwd, check=check, capture_output=True, text=True)
+    if not capture:
+        return subprocess.run(cmd, cwd=cwd, env=env, check=check)
+    result = subprocess.run(cmd, cwd=cwd, env=env, check=check, capture_output=True,
+                            text=True, encoding='utf-8', errors='replace')
     if result.returncode != 0 and result.stderr:
         print(f"Warning: {result.stderr.strip()}")
     return result
@@ -26,27 +37,24 @@ def get_project_name():
     Detect the Docker Compose project name by checking running containers.
     Falls back to deriving it from the current directory name.
     """
-    # Try to find the project name from existing containers
+    # Try to find the project name from existing containers, reading the
+    # compose project label in the same call
     result = subprocess.run(
-        ["docker", "ps", "-a", "--format", "{{.Names}}"],
-        capture_output=True, text=True, check=False
+        ["docker", "ps", "-a", "--format",
+         "{{.Label \"com.docker.compose.project\"}}\t{{.Names}}"],
+        env=_DOCKER_ENV, capture_output=True, text=True, encoding='utf-8', errors='replace', check=False
     )
 
     if result.returncode == 0 and result.stdout:
-        containers = result.stdout.strip().split('\n')
+        # Don't strip the whole output: an unlabelled first container would lose its tab
+        containers = result.stdout.splitlines()
         # Look for supabase or local-ai-packaged containers
-        for container in containers:
-            if 'supabase' in container or 'local-ai-packaged' in container:
-                # Get the project label from this container
-                inspect_result = subprocess.run(
-                    ["docker", "inspect", container, "--format",
-                     "{{index .Config.Labels \"com.docker.compose.project\"}}"],
-                    capture_output=True, text=True, check=False
-                )
-                if inspect_result.returncode == 0 and inspect_result.stdout.strip():
-                    project_name = inspect_result.stdout.strip()
-                    print(f"Detected Docker Compose project name: {project_name}")
-                    return project_name
+        for line in containers:
+            project_name, _, container = line.partition('\t')
+            project_name = project_name.strip()
+            if ('supabase' in container or 'local-ai-packaged' in container) and project_name:
+                print(f"Detected Docker Compose project name: {project_name}")
+                return project_name
 
     # Fallback: use current directory name
     project_name = os.path.basename(os.getcwd())
@@ -68,7 +76,7 @@ def stop_supabase_stack(project_name):
         return
 
     cmd = ["docker", "compose", "-p", project_name, "-f", supabase_compose_path, "down"]
-    result = run_command(cmd)
+    result = run_command(cmd, capture=False)
 
     if result.returncode == 0:
         print("Supabase stack stopped successfully.")
@@ -97,7 +105,7 @@ def stop_local_ai_stack(project_name, profile=None):
 
     cmd.extend(["-f", compose_path, "down"])
 
-    result = run_command(cmd)
+    result = run_command(cmd, capture=False)
 
     if result.returncode == 0:
         print("Local AI stack stopped successfully.")
@@ -111,18 +119,23 @@ def stop_all_localai_containers(project_name):
     print(f"Stopping all containers in '{project_name}' project...")
     print("="*60)
 
-    # First, try to stop all profiles
+    # Stop all profiles. These calls are not independent: every one of them
+    # includes the Supabase services and shared network (via the include in
+    # docker-compose.yml), and the ollama services share a container name,
+    # so running them concurrently races on the same containers.
     profiles = ["cpu", "gpu-nvidia", "gpu-amd"]
 
     for profile in profiles:
         print(f"\nChecking for containers with profile: {profile}")
         cmd = ["docker", "compose", "-p", project_name, "--profile", profile, "-f", "docker-compose.yml", "down"]
-        run_command(cmd)
+        run_command(cmd, capture=False)
 
-    # Also run without any profile to catch remaining containers
-    print("\nStopping containers without specific profiles...")
-    cmd = ["docker", "compose", "-p", project_name, "-f", "docker-compose.yml", "down"]
-    run_command(cmd)
+    # Once the profile downs have finished, run without any profile to catch
+    # remaining containers. docker-compose.yml includes the Supabase compose
+    # file, so this call also tears down the Supabase stack and its orphans.
+    print("\nStopping Supabase and containers without specific profiles...")
+    cmd = ["docker", "compose", "-p", project_name, "-f", "docker-compose.yml", "down", "--remove-orphans"]
+    run_command(cmd, capture=False)
 
 
 def list_remaining_containers(project_name):
@@ -167,13 +180,12 @@ def main():
     # Detect the project name
     project_name = get_project_name()
 
-    # Stop Supabase stack
-    stop_supabase_stack(project_name)
-
-    # Stop local AI stack based on profile argument
+    # Stop local AI stack based on profile argument. With "all", the Supabase
+    # stack is stopped in the same compose invocation via the main file's include.
     if args.profile == "all":
         stop_all_localai_containers(project_name)
     else:
+        stop_supabase_stack(project_name)
         stop_local_ai_stack(project_name, args.profile)
 
     # List remaining containers if requested